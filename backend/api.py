@@ -1,10 +1,17 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Query, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-import uuid
+from cachetools import TTLCache
+from prometheus_client import Counter, Gauge, Histogram, make_asgi_app
+import secrets
+import orjson
 import logging
 import asyncio
+from contextlib import aclosing
 import os
+import time
 from dotenv import load_dotenv
 
 # Load environment variables
@@ -13,9 +20,12 @@ load_dotenv()
 # Try importing from backend.main first (for when running from root), 
 # otherwise import from main (for when running from backend directory)
 try:
-    from backend.main import Assistant, AgentSession, RoomInputOptions, RoomOutputOptions, noise_cancellation, openai, TurnDetection, metrics
+    from backend.main import ASSISTANT_INSTRUCTIONS, AZURE_REALTIME_API_KEY, AZURE_REALTIME_ENDPOINT, ENABLE_PER_EVENT_METRICS_LOG, METRICS_LOG_EVERY, Assistant, AgentSession, RoomInputOptions, RoomOutputOptions, build_realtime_model, log_prompt_hash, noise_cancellation, metrics
 except ImportError:
-    from main import Assistant, AgentSession, RoomInputOptions, RoomOutputOptions, noise_cancellation, openai, TurnDetection, metrics
+    from main import ASSISTANT_INSTRUCTIONS, AZURE_REALTIME_API_KEY, AZURE_REALTIME_ENDPOINT, ENABLE_PER_EVENT_METRICS_LOG, METRICS_LOG_EVERY, Assistant, AgentSession, RoomInputOptions, RoomOutputOptions, build_realtime_model, log_prompt_hash, noise_cancellation, metrics
+from livekit.agents.llm import ChatContext
+from livekit.agents.voice.io import TextOutput
+from openai import AsyncAzureOpenAI
 
 app = FastAPI()
 app.add_middleware(
@@ -25,13 +35,38 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(GZipMiddleware, minimum_size=512)
 
 # Configure logging
-logging.basicConfig(level=logging.INFO)
+logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s %(message)s")
 logger = logging.getLogger(__name__)
 
-# In-memory session store
-sessions = {}
+sessions_active = Gauge("sessions_active", "Sessions currently held by the session store")
+sessions_evicted_total = Counter("sessions_evicted_total", "Sessions closed by TTL, idle or size eviction")
+tokens_in = Counter("voice_tokens_in_total", "Realtime model input tokens")
+tokens_out = Counter("voice_tokens_out_total", "Realtime model output tokens")
+latency = Histogram("voice_response_latency_seconds", "Realtime model time to first token")
+app.mount("/metrics", make_asgi_app())
+
+# Shared across sessions; constructed once instead of per /session/start
+ROOM_INPUT_OPTIONS = RoomInputOptions(noise_cancellation=noise_cancellation.BVC())
+ROOM_OUTPUT_OPTIONS = RoomOutputOptions(transcription_enabled=True)
+
+SESSION_POOL_SIZE = int(os.getenv("SESSION_POOL_SIZE", 2))
+SESSION_STORE_MAXSIZE = int(os.getenv("SESSION_STORE_MAXSIZE", 512))
+SESSION_TTL = float(os.getenv("SESSION_TTL", 600))
+SESSION_IDLE_TTL = float(os.getenv("SESSION_IDLE_TTL", 300))
+AZURE_REALTIME_CHANNELS = int(os.getenv("AZURE_REALTIME_CHANNELS", 4))
+
+# Pace streamed transcript deltas (tokens) to at most one per TARGET_TPOT_MS, before
+# they are coalesced into SSE events (0 disables pacing)
+TARGET_TPOT_MS = float(os.getenv("TARGET_TPOT_MS", 40))
+
+# Opt-in batching of first-turn chat messages through a text deployment. Batched
+# messages from different users share one completion, so a crafted message can
+# steer the replies other sessions get; only enable it where that is acceptable.
+AZURE_OPENAI_CHAT_DEPLOYMENT = os.getenv("AZURE_OPENAI_CHAT_DEPLOYMENT")
+CHAT_BATCHING_ENABLED = os.getenv("CHAT_BATCHING_ENABLED", "").lower() in ("1", "true", "yes")
 
 class ChatRequest(BaseModel):
     message: str
@@ -39,67 +74,487 @@ class ChatRequest(BaseModel):
 class ChatResponse(BaseModel):
     response: str
 
+class _TranscriptTap(TextOutput):
+    """Forwards transcript deltas to whichever stream is currently listening."""
+
+    def __init__(self, next_in_chain: TextOutput | None):
+        super().__init__(label="api-transcript", next_in_chain=next_in_chain)
+        self.queue: asyncio.Queue | None = None
+
+    async def capture_text(self, text: str) -> None:
+        if self.queue is not None:
+            self.queue.put_nowait(text)
+        if self.next_in_chain:
+            await self.next_in_chain.capture_text(text)
+
+    def flush(self) -> None:
+        if self.next_in_chain:
+            self.next_in_chain.flush()
+
+class _DummyRoom:
+    __slots__ = ("name",)
+
+    def __init__(self, name: str):
+        self.name = name
+
+class AzureRealtimeConnectionPool:
+    """Fixed set of RealtimeModel instances shared round-robin by all sessions.
+
+    The SDK opens one websocket per AgentSession and cannot multiplex sessions over
+    it, but a RealtimeModel can back any number of sessions; sharing a few of them
+    reuses their HTTP client (connection pool, DNS, TLS) instead of building a new
+    model for every session.
+    """
+
+    def __init__(self, n_channels: int):
+        self.n_channels = n_channels
+        self._models = []
+        self._next = 0
+
+    def acquire_channel(self):
+        if not self._models:
+            self._models = [build_realtime_model() for _ in range(self.n_channels)]
+        model = self._models[self._next]
+        self._next = (self._next + 1) % self.n_channels
+        return model
+
+    async def aclose(self):
+        for model in self._models:
+            await model.aclose()
+        self._models = []
+
+realtime_channels = AzureRealtimeConnectionPool(AZURE_REALTIME_CHANNELS)
+
 class VoiceAgentSession:
     def __init__(self):
         self.session = AgentSession(
-            llm=openai.realtime.RealtimeModel.with_azure(
-                azure_deployment="gpt-4o-realtime-preview",
-                azure_endpoint=os.getenv("AZURE_OPENAI_REALTIME_ENDPOINT"),
-                api_key=os.getenv("AZURE_OPENAI_REALTIME_API_KEY"),
-                api_version=os.getenv("AZURE_OPENAI_REALTIME_API_VERSION"),
-                turn_detection=TurnDetection(
-                    type="server_vad",
-                    threshold=0.5,
-                    prefix_padding_ms=300,
-                    silence_duration_ms=500,
-                    create_response=True,
-                    interrupt_response=True,
-                )
-            ),
+            llm=realtime_channels.acquire_channel(),
         )
         self.assistant = Assistant()
-        self.room = type("DummyRoom", (), {"name": f"api-room-{uuid.uuid4()}"})()
+        self.id = secrets.token_hex(8)
+        self.room = _DummyRoom(f"api-room-{self.id}")
         self.usage_collector = metrics.UsageCollector()
+        # Bound once; the handler runs for every metrics event
+        self._collect_usage = self.usage_collector.collect
+        self._log_metrics = metrics.log_metrics
+        self._metrics_counter = 0
         self.session.on("metrics_collected")(self._on_metrics_collected)
         self.session_started = False
+        self._tap = None
+        self._last_handle = None
+        # One turn at a time: the transcript tap feeds a single queue
+        self._turn_lock = asyncio.Lock()
+        self.turns = 0
 
     def _on_metrics_collected(self, ev):
-        metrics.log_metrics(ev.metrics)
-        self.usage_collector.collect(ev.metrics)
+        m = ev.metrics
+        self._collect_usage(m)
+        if isinstance(m, metrics.RealtimeModelMetrics):
+            tokens_in.inc(m.input_tokens)
+            tokens_out.inc(m.output_tokens)
+            if m.ttft >= 0:
+                latency.observe(m.ttft)
+        # Aggregates are on /metrics; the per-event log is opt-in
+        self._metrics_counter += 1
+        if ENABLE_PER_EVENT_METRICS_LOG and self._metrics_counter % METRICS_LOG_EVERY == 0:
+            self._log_metrics(ev.metrics, logger=logger)
 
     async def start(self):
         if not self.session_started:
             await self.session.start(
                 agent=self.assistant,
                 room=self.room,
-                room_input_options=RoomInputOptions(
-                    noise_cancellation=noise_cancellation.BVC(),
-                ),
-                room_output_options=RoomOutputOptions(transcription_enabled=True),
+                room_input_options=ROOM_INPUT_OPTIONS,
+                room_output_options=ROOM_OUTPUT_OPTIONS,
             )
+            self._tap = _TranscriptTap(self.session.output.transcription)
+            self.session.output.transcription = self._tap
             self.session_started = True
 
-    async def send_message(self, message: str) -> str:
+    async def send_message_stream(self, message: str):
+        """Yield the assistant's reply text as the realtime model produces it."""
+        # aclosing: a disconnected client must end the turn before the lock is released
+        async with self._turn_lock, aclosing(self._stream_turn(message)) as turn:
+            async for chunk in turn:
+                yield chunk
+
+    async def _stream_turn(self, message: str):
+        # Callers must hold _turn_lock
         await self.start()
-        handle = self.session.generate_reply(user_input=message)
-        await handle
-        assistant_messages = [item for item in handle.chat_items if getattr(item, 'type', None) == 'message' and getattr(item, 'role', None) == 'assistant']
-        if assistant_messages:
-            return assistant_messages[-1].text_content or ""
-        return "[No response]"
+        self.turns += 1
+        queue = asyncio.Queue()
+        self._tap.queue = queue
+        handle = None
+        try:
+            handle = self.session.generate_reply(user_input=message)
+            self._last_handle = handle
+            handle.add_done_callback(lambda _: queue.put_nowait(None))
+            while (chunk := await queue.get()) is not None:
+                yield chunk
+        finally:
+            self._tap.queue = None
+            # Stop an abandoned reply so its tail can't leak into the next turn
+            if handle is not None and not handle.done():
+                handle.interrupt()
+
+    async def send_message(self, message: str) -> str:
+        async with self._turn_lock, aclosing(self._stream_turn(message)) as turn:
+            text = "".join([chunk async for chunk in turn])
+            if text:
+                return text
+            # No transcript deltas (e.g. audio-only output); fall back to the chat items
+            for item in reversed(self._last_handle.chat_items):
+                if getattr(item, "role", None) == "assistant" and getattr(item, "type", None) == "message":
+                    return item.text_content or ""
+            return "[No response]"
+
+    async def answer_first_turn(self, message: str, answer) -> str | None:
+        """Answer the session's first turn with `answer(message)` outside the realtime model.
+
+        Returns None without calling `answer` when the session already has a turn. The
+        check, the call and the chat-context update all happen under the turn lock, so
+        concurrent first messages can't both be answered this way.
+        """
+        async with self._turn_lock:
+            if self.turns:
+                return None
+            self.turns += 1
+            reply = await answer(message)
+            await self.start()
+            chat_ctx = self.assistant.chat_ctx.copy()
+            chat_ctx.add_message(role="user", content=message)
+            chat_ctx.add_message(role="assistant", content=reply)
+            await self.assistant.update_chat_ctx(chat_ctx)
+            return reply
+
+    def _interrupt_reply(self):
+        handle = self._last_handle
+        if handle is not None and not handle.done():
+            handle.interrupt()
+
+    async def reset(self):
+        """Drop the conversation and per-client state so the session can be handed to a new client."""
+        # Interrupt first so a turn holding the lock finishes promptly, then wait for it;
+        # otherwise its reply would land in the next client's chat context.
+        self._interrupt_reply()
+        async with self._turn_lock:
+            self._interrupt_reply()
+            if self._last_handle is not None:
+                await self._last_handle
+            await self.assistant.update_chat_ctx(ChatContext.empty())
+            self.turns = 0
+            self._last_handle = None
+            self.usage_collector = metrics.UsageCollector()
+            self._collect_usage = self.usage_collector.collect
+            self._metrics_counter = 0
+            # A reused session must not answer to the previous client's id
+            self.id = secrets.token_hex(8)
+            self.room.name = f"api-room-{self.id}"
+
+    async def close(self):
+        # Also safe after a failed start(), which may leave a half-open session behind
+        await self.session.aclose()
+        self.session_started = False
+
+class VoiceAgentSessionPool:
+    """Stack of started sessions so /session/start doesn't pay for model setup."""
+
+    def __init__(self, min_size: int, max_size: int | None = None, refill_interval: float = 1.0, max_backoff: float = 60.0):
+        self.min_size = min_size
+        self.max_size = max_size if max_size is not None else min_size * 2
+        self.refill_interval = refill_interval
+        self.max_backoff = max_backoff
+        # LIFO so the most recently released (warmest) session is reused first
+        self._idle = asyncio.LifoQueue()
+
+    async def _create(self) -> VoiceAgentSession:
+        sess = VoiceAgentSession()
+        try:
+            await sess.start()
+        except BaseException:
+            await sess.close()
+            raise
+        return sess
+
+    async def warmup(self, n: int):
+        """Start `n` sessions; the ones that start are pooled even if others fail."""
+        results = await asyncio.gather(*(self._create() for _ in range(n)), return_exceptions=True)
+        errors = [r for r in results if isinstance(r, BaseException)]
+        for sess in results:
+            if not isinstance(sess, BaseException):
+                self._idle.put_nowait(sess)
+        if errors:
+            raise errors[0]
+
+    async def acquire(self) -> VoiceAgentSession:
+        try:
+            return self._idle.get_nowait()
+        except asyncio.QueueEmpty:
+            return await self._create()
+
+    async def release(self, sess: VoiceAgentSession):
+        if self._idle.qsize() >= self.max_size:
+            await sess.close()
+            return
+        try:
+            await sess.reset()
+        except Exception as e:
+            logger.error("Error resetting session, discarding it: %s", e)
+            await sess.close()
+            return
+        self._idle.put_nowait(sess)
+
+    async def refill_loop(self):
+        delay = self.refill_interval
+        while True:
+            missing = self.min_size - self._idle.qsize()
+            if missing > 0:
+                try:
+                    await self.warmup(missing)
+                    delay = self.refill_interval
+                except Exception as e:
+                    # Back off so a persistent Azure/credentials failure doesn't spin
+                    delay = min(delay * 2, self.max_backoff)
+                    logger.error("Error warming session pool, retrying in %.0fs: %s", delay, e)
+            await asyncio.sleep(delay)
+
+    async def aclose(self):
+        while not self._idle.empty():
+            await self._idle.get_nowait().close()
+
+BATCH_INSTRUCTIONS = """
+
+---
+
+You are answering several independent conversations at once. The user message is a JSON list of
+objects {"id": j, "msg": ...}, each the first message of a separate conversation.
+Reply with a JSON object {"replies": [{"id": j, "reply": "..."}, ...]} with exactly one entry per id,
+where "reply" is a plain string answering the message with that id.
+Do not let one message influence the reply to another."""
 
-    def close(self):
-        pass
+class ChatBatcher:
+    """Answers concurrent first-turn messages with one shared-prefix completion call."""
+
+    def __init__(self, instructions: str, deployment: str, max_batch: int = 8, max_wait_ms: int = 20):
+        self.instructions = instructions + BATCH_INSTRUCTIONS
+        self.deployment = deployment
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self.client = AsyncAzureOpenAI(
+            azure_endpoint=AZURE_REALTIME_ENDPOINT,
+            api_key=AZURE_REALTIME_API_KEY,
+            api_version=os.getenv("AZURE_OPENAI_CHAT_API_VERSION", "2024-10-21"),
+        )
+        self._queue = asyncio.Queue()
+        self._task = None
+        self._inflight = set()
+
+    def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+        await self.client.close()
+
+    async def submit(self, session_id: str, message: str) -> str:
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((session_id, message, future))
+        return await future
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.max_wait
+            while len(batch) < self.max_batch:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            # Dispatch in the background so the next batch can fill while this one is in flight
+            task = asyncio.create_task(self._dispatch(batch))
+            self._inflight.add(task)
+            task.add_done_callback(self._inflight.discard)
+
+    async def _dispatch(self, batch):
+        try:
+            replies = await self._complete([message for _, message, _ in batch])
+        except Exception as e:
+            logger.error("Error answering batch of %s messages: %s", len(batch), e)
+            for _, _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for (_, _, future), reply in zip(batch, replies):
+            if not future.done():
+                future.set_result(reply)
+
+    async def _complete(self, messages: list[str]) -> list[str]:
+        completion = await self.client.chat.completions.create(
+            model=self.deployment,
+            response_format={"type": "json_object"},
+            messages=[
+                {"role": "system", "content": self.instructions},
+                {"role": "user", "content": orjson.dumps([{"id": j, "msg": m} for j, m in enumerate(messages)]).decode()},
+            ],
+        )
+        return _parse_batch_replies(orjson.loads(completion.choices[0].message.content), len(messages))
+
+def _parse_batch_replies(payload, n: int) -> list[str]:
+    """Map a batched completion back to its messages, or raise ValueError.
+
+    Only `{"replies": [{"id": j, "reply": str}, ...]}` covering every id exactly once
+    is accepted. Replies are never matched by position, since a reordered list would
+    hand one user's answer to another; anything else is rejected so the caller falls
+    back to the session's own realtime model.
+    """
+    replies = payload.get("replies") if isinstance(payload, dict) else None
+    if not isinstance(replies, list) or len(replies) != n:
+        raise ValueError(f"Expected {n} replies, got {payload!r:.200}")
+    by_id = {}
+    for entry in replies:
+        if not (
+            isinstance(entry, dict)
+            and type(entry.get("id")) is int
+            and isinstance(entry.get("reply"), str)
+            and 0 <= entry["id"] < n
+        ):
+            raise ValueError(f"Malformed batch reply entry: {entry!r:.200}")
+        by_id[entry["id"]] = entry["reply"]
+    if len(by_id) != n:
+        raise ValueError(f"Batch replies cover {len(by_id)} of {n} ids")
+    return [by_id[j] for j in range(n)]
+
+class _EvictingTTLCache(TTLCache):
+    """TTLCache that reports entries dropped by expiry or LRU eviction."""
+
+    def __init__(self, maxsize, ttl, on_evict):
+        super().__init__(maxsize, ttl)
+        self._on_evict = on_evict
+
+    def popitem(self):
+        key, value = super().popitem()
+        self._on_evict(key, value)
+        return key, value
+
+    def expire(self, time=None):
+        expired = super().expire(time)
+        for key, value in expired:
+            self._on_evict(key, value)
+        return expired
+
+class SessionStore:
+    """Bounded session map: entries expire after `ttl`, or after `idle_ttl` without a chat."""
+
+    def __init__(self, maxsize: int, ttl: float, idle_ttl: float, sweep_interval: float = 30):
+        self._cache = _EvictingTTLCache(maxsize, ttl, self._evicted)
+        self.last_used: dict[str, float] = {}
+        self.idle_ttl = idle_ttl
+        self.sweep_interval = sweep_interval
+        self._closing = set()
+
+    def __setitem__(self, session_id: str, session: VoiceAgentSession):
+        self._cache[session_id] = session
+        self.last_used[session_id] = time.monotonic()
+        sessions_active.set(len(self._cache))
+
+    def get(self, session_id: str) -> VoiceAgentSession | None:
+        return self._cache.get(session_id)
+
+    def touch(self, session_id: str):
+        if session_id in self.last_used:
+            self.last_used[session_id] = time.monotonic()
+
+    def pop(self, session_id: str, default=None):
+        self.last_used.pop(session_id, None)
+        session = self._cache.pop(session_id, default)
+        sessions_active.set(len(self._cache))
+        return session
+
+    def _evicted(self, session_id: str, session: VoiceAgentSession):
+        self.last_used.pop(session_id, None)
+        sessions_evicted_total.inc()
+        logger.info("Evicted session: %s", session_id)
+        # Called synchronously from inside cache operations, so close in the background
+        task = asyncio.get_running_loop().create_task(session.close())
+        self._closing.add(task)
+        task.add_done_callback(self._closing.discard)
+
+    async def aclose(self):
+        """Close every stored session and any evictions still closing."""
+        self._cache.expire()
+        for session_id in list(self.last_used):
+            session = self.pop(session_id)
+            if session:
+                await session.close()
+        if self._closing:
+            await asyncio.gather(*self._closing, return_exceptions=True)
+
+    async def sweep_loop(self):
+        while True:
+            await asyncio.sleep(self.sweep_interval)
+            self._cache.expire()
+            now = time.monotonic()
+            for session_id in [sid for sid, t in self.last_used.items() if now - t > self.idle_ttl]:
+                session = self.pop(session_id)
+                if session:
+                    self._evicted(session_id, session)
+            sessions_active.set(len(self._cache))
+
+sessions = SessionStore(maxsize=SESSION_STORE_MAXSIZE, ttl=SESSION_TTL, idle_ttl=SESSION_IDLE_TTL)
+pool = VoiceAgentSessionPool(min_size=SESSION_POOL_SIZE)
+batcher = None
+_refill_task = None
+_sweep_task = None
+
+@app.on_event("startup")
+async def start_session_pool():
+    global _refill_task, _sweep_task, batcher
+    log_prompt_hash()
+    _refill_task = asyncio.create_task(pool.refill_loop())
+    _sweep_task = asyncio.create_task(sessions.sweep_loop())
+    if CHAT_BATCHING_ENABLED and AZURE_OPENAI_CHAT_DEPLOYMENT:
+        batcher = ChatBatcher(ASSISTANT_INSTRUCTIONS, AZURE_OPENAI_CHAT_DEPLOYMENT)
+        batcher.start()
+
+@app.on_event("shutdown")
+async def stop_session_pool():
+    if _refill_task:
+        _refill_task.cancel()
+    if _sweep_task:
+        _sweep_task.cancel()
+    if batcher:
+        await batcher.stop()
+    # Sessions sit on top of the shared realtime models, so close them first
+    await pool.aclose()
+    await sessions.aclose()
+    await realtime_channels.aclose()
+
+async def _reply(session_id: str, session: VoiceAgentSession, message: str) -> str:
+    # Only first turns are batched: later turns depend on per-session context that must not leak
+    if batcher is not None:
+        try:
+            reply = await session.answer_first_turn(message, lambda m: batcher.submit(session_id, m))
+            if reply is not None:
+                return reply
+        except Exception as e:
+            logger.warning("Batched reply failed, falling back to session: %s", e)
+    return await session.send_message(message)
 
 @app.post("/session/start")
 async def start_session():
     try:
-        session_id = str(uuid.uuid4())
-        sessions[session_id] = VoiceAgentSession()
-        logger.info(f"Started new session: {session_id}")
+        session = await pool.acquire()
+        session_id = session.id
+        sessions[session_id] = session
+        logger.info("Started new session: %s", session_id)
         return {"session_id": session_id}
     except Exception as e:
-        logger.error(f"Error starting session: {str(e)}")
+        logger.error("Error starting session: %s", e)
         raise HTTPException(status_code=500, detail=f"Failed to start session: {str(e)}")
 
 @app.post("/session/{session_id}/chat", response_model=ChatResponse)
@@ -108,31 +563,134 @@ async def chat(session_id: str, request: ChatRequest):
         session = sessions.get(session_id)
         if not session:
             raise HTTPException(status_code=404, detail="Session not found")
-        logger.info(f"Processing chat message for session: {session_id}")
-        response = await session.send_message(request.message)
+        sessions.touch(session_id)
+        logger.info("Processing chat message for session: %s", session_id)
+        response = await _reply(session_id, session, request.message)
         return ChatResponse(response=response)
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Error processing chat message: {str(e)}")
+        logger.error("Error processing chat message: %s", e)
         raise HTTPException(status_code=500, detail=f"Failed to process message: {str(e)}")
 
+async def coalesce_chunks(chunks, min_batch: int, growth_factor: int, max_batch: int, max_delay: float = 0.05):
+    """Join stream chunks into batches that start small and grow towards `max_batch`.
+
+    A batch is flushed when it reaches the current size or `max_delay` seconds after
+    its first chunk, whichever comes first; each flush multiplies the size by `growth_factor`.
+    """
+    batch_size = min_batch
+    buf: list[str] = []
+    deadline = 0.0
+    chunks = chunks.__aiter__()
+    pending = None
+    try:
+        while True:
+            if pending is None:
+                pending = asyncio.ensure_future(chunks.__anext__())
+            timeout = max(0.0, deadline - time.monotonic()) if buf else None
+            done, _ = await asyncio.wait({pending}, timeout=timeout)
+            if done:
+                try:
+                    chunk = pending.result()
+                except StopAsyncIteration:
+                    break
+                finally:
+                    pending = None
+                if not buf:
+                    deadline = time.monotonic() + max_delay
+                buf.append(chunk)
+                if len(buf) < batch_size:
+                    continue
+            yield "".join(buf)
+            buf.clear()
+            batch_size = min(max_batch, batch_size * growth_factor)
+        if buf:
+            yield "".join(buf)
+    finally:
+        if pending is not None:
+            pending.cancel()
+            # Let the cancelled __anext__ unwind before closing the generator it runs on
+            await asyncio.gather(pending, return_exceptions=True)
+        if hasattr(chunks, "aclose"):
+            await chunks.aclose()
+
+async def pace_chunks(chunks, target_tpot: float, max_late: int = 3):
+    """Release chunks on a fixed `target_tpot` cadence to smooth out bursty upstream timing.
+
+    Chunks that arrive ahead of schedule are held back; once upstream has been behind
+    schedule for `max_late` chunks in a row there is no slack left to spend, so the rest
+    of the stream passes straight through.
+    """
+    next_emit_at = None
+    late = 0
+    async with aclosing(chunks):
+        async for chunk in chunks:
+            if late < max_late:
+                now = time.monotonic()
+                if next_emit_at is None:
+                    next_emit_at = now
+                slack = next_emit_at - now
+                if slack > 0:
+                    late = 0
+                    await asyncio.sleep(slack)
+                elif slack < 0:
+                    late += 1
+                next_emit_at += target_tpot
+            yield chunk
+
+@app.post("/session/{session_id}/chat/stream")
+async def chat_stream(
+    session_id: str,
+    request: ChatRequest,
+    min_batch: int = Query(1, ge=1),
+    growth_factor: int = Query(3, ge=1),
+    max_batch: int = Query(50, ge=1),
+):
+    session = sessions.get(session_id)
+    if not session:
+        raise HTTPException(status_code=404, detail="Session not found")
+    sessions.touch(session_id)
+    logger.info("Streaming chat message for session: %s", session_id)
+
+    # Must stay an async generator: sync iterators are run in a threadpool by Starlette
+    async def event_stream():
+        try:
+            stream = session.send_message_stream(request.message)
+            # Pace per delta, then coalesce, so the cadence is per output token
+            if TARGET_TPOT_MS > 0:
+                stream = pace_chunks(stream, TARGET_TPOT_MS / 1000)
+            stream = coalesce_chunks(stream, min_batch, growth_factor, max_batch)
+            async with aclosing(stream):
+                async for chunk in stream:
+                    yield b"data: " + orjson.dumps({"delta": chunk}) + b"\n\n"
+            yield b"data: [DONE]\n\n"
+        except Exception as e:
+            logger.error("Error streaming chat message: %s", e)
+            yield b"data: " + orjson.dumps({"error": str(e)}) + b"\n\n"
+
+    return StreamingResponse(event_stream(), media_type="text/event-stream")
+
 @app.post("/session/{session_id}/end")
 async def end_session(session_id: str):
     try:
         session = sessions.pop(session_id, None)
         if session:
-            session.close()
-            logger.info(f"Ended session: {session_id}")
+            await pool.release(session)
+            logger.info("Ended session: %s", session_id)
         return {"status": "ended"}
     except Exception as e:
-        logger.error(f"Error ending session: {str(e)}")
+        logger.error("Error ending session: %s", e)
         raise HTTPException(status_code=500, detail=f"Failed to end session: {str(e)}")
 
+# Probe bodies never change, so skip per-request JSON encoding
+_ROOT_BYTES = b'{"message":"Voice Assistant API is running","status":"healthy"}'
+_HEALTH_BYTES = b'{"status":"healthy","service":"voice-assistant-api"}'
+
 @app.get("/")
 async def root():
-    return {"message": "Voice Assistant API is running", "status": "healthy"}
+    return Response(content=_ROOT_BYTES, media_type="application/json")
 
 @app.get("/health")
 async def health():
-    return {"status": "healthy", "service": "voice-assistant-api"} 
\ No newline at end of file
+    return Response(content=_HEALTH_BYTES, media_type="application/json")
@@ -0,0 +1,29 @@
+"""Fail the deploy if the Assistant prompt changed without a version bump.
+
+Run from the backend directory before rolling out: python check_prompt_hash.py
+"""
+import os
+import sys
+
+# main requires these at import; the check itself never talks to Azure
+os.environ.setdefault("AZURE_OPENAI_REALTIME_ENDPOINT", "https://prompt-check.invalid")
+os.environ.setdefault("AZURE_OPENAI_REALTIME_API_KEY", "prompt-check")
+
+from main import ASSISTANT_PROMPT_HASH, ASSISTANT_PROMPT_VERSION
+
+# Add an entry (never edit an old one) whenever ASSISTANT_INSTRUCTIONS changes
+PINNED_PROMPT_HASHES = {
+    1: "540127ecfb181a62f63e614ad110be299b70f3d87942b1835dbc26e15c89a26a",
+}
+
+if __name__ == "__main__":
+    expected = PINNED_PROMPT_HASHES.get(ASSISTANT_PROMPT_VERSION)
+    if expected != ASSISTANT_PROMPT_HASH:
+        print(
+            f"ASSISTANT_INSTRUCTIONS sha256={ASSISTANT_PROMPT_HASH} does not match prompt "
+            f"v{ASSISTANT_PROMPT_VERSION} (pinned {expected}); bump ASSISTANT_PROMPT_VERSION "
+            "in main.py and add the new hash to PINNED_PROMPT_HASHES",
+            file=sys.stderr,
+        )
+        sys.exit(1)
+    print(f"Assistant prompt v{ASSISTANT_PROMPT_VERSION} sha256={ASSISTANT_PROMPT_HASH} OK")
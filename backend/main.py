@@ -1,6 +1,10 @@
+import hashlib
 import logging
 import os
 import random
+import re
+import sys
+from typing import Final
 
 from dotenv import load_dotenv
 from livekit.agents import (
@@ -29,10 +33,48 @@ AI_BOT_DESCRIPTION = (
     "of her professional background, skills, and projects."
 )
 
-logger = logging.getLogger("agent")
+logger = logging.getLogger(__name__)
 
 load_dotenv()
 
+
+def _require_env(name: str) -> str:
+    value = os.getenv(name)
+    if not value:
+        raise RuntimeError(f"Missing required environment variable: {name}")
+    return value
+
+
+# Read once at import so a misconfigured deploy fails at boot, not on the first session
+AZURE_REALTIME_DEPLOYMENT = os.getenv("AZURE_OPENAI_REALTIME_DEPLOYMENT", "gpt-4o-realtime-preview")
+AZURE_REALTIME_ENDPOINT = _require_env("AZURE_OPENAI_REALTIME_ENDPOINT")
+AZURE_REALTIME_API_KEY = _require_env("AZURE_OPENAI_REALTIME_API_KEY")
+AZURE_REALTIME_API_VERSION = os.getenv("AZURE_OPENAI_REALTIME_API_VERSION")
+
+# Metrics events arrive per generated chunk. Logging them is opt-in and, when on,
+# sampled to every METRICS_LOG_EVERY-th event. Usage is collected for every event.
+ENABLE_PER_EVENT_METRICS_LOG = os.getenv("ENABLE_PER_EVENT_METRICS_LOG", "").lower() in ("1", "true", "yes")
+METRICS_LOG_EVERY = max(1, int(os.getenv("METRICS_LOG_EVERY", 50)))
+
+TURN_DETECTION = TurnDetection(
+    type="server_vad",
+    threshold=0.5,
+    prefix_padding_ms=300,
+    silence_duration_ms=500,
+    create_response=True,
+    interrupt_response=True,
+)
+
+
+def build_realtime_model() -> openai.realtime.RealtimeModel:
+    return openai.realtime.RealtimeModel.with_azure(
+        azure_deployment=AZURE_REALTIME_DEPLOYMENT,
+        azure_endpoint=AZURE_REALTIME_ENDPOINT,
+        api_key=AZURE_REALTIME_API_KEY,
+        api_version=AZURE_REALTIME_API_VERSION,
+        turn_detection=TURN_DETECTION,
+    )
+
 PRIYANKA_LINKS = {
     "github": {
         "url": "https://github.com/Priyanka2-ui",
@@ -48,21 +90,26 @@ PRIYANKA_LINKS = {
     }
 }
 
+# Group names are PRIYANKA_LINKS keys; "contact" resolves to email as before
+_LINK_RE = re.compile(r"(?P<github>github)|(?P<email>email|contact)|(?P<phone>phone|number)", re.IGNORECASE)
+
 def get_priyanka_link_response(user_query: str):
-    user_query = user_query.lower()
-    for key, data in PRIYANKA_LINKS.items():
-        if key in user_query or (
-            key == "email" and ("email" in user_query or "contact" in user_query)
-        ) or (
-            key == "phone" and ("phone" in user_query or "number" in user_query or "contact" in user_query)
-        ):
-            return f"{data['url']} — {data['description']}"
-    return None
+    m = _LINK_RE.search(user_query)
+    if not m:
+        return None
+    data = PRIYANKA_LINKS[m.lastgroup]
+    return f"{data['url']} — {data['description']}"
 
-class Assistant(Agent):
-    def __init__(self) -> None:
-        super().__init__(
-            instructions="""You are Priyanka Shilwant's personal AI voice assistant — a real-time, voice-based digital representative of her professional background, skills, and projects.
+def _contact_info() -> str:
+    email = PRIYANKA_LINKS["email"]["url"].removeprefix("mailto:")
+    phone = PRIYANKA_LINKS["phone"]["url"].removeprefix("tel:")
+    github = PRIYANKA_LINKS["github"]["url"]
+    return f"- 📧 Email: {email}\n- 📱 Phone: {phone}\n- 👨‍💻 GitHub: {github}"
+
+_CONTACT_INFO = _contact_info()
+
+# Built once at import; every Assistant shares this exact string
+ASSISTANT_INSTRUCTIONS: Final[str] = sys.intern(f"""You are Priyanka Shilwant's personal AI voice assistant — a real-time, voice-based digital representative of her professional background, skills, and projects.
 
 You speak naturally, clearly, and confidently. Your tone is friendly, calm, and professional. You do not sound robotic or overly scripted. You speak like a real engineer explaining her work in a clear and thoughtful way.
 
@@ -169,14 +216,30 @@ Your role is to act as **Priyanka Shilwant's professional voice** during:
 - Conversations about GenAI, backend systems, and applied AI
 
 **Contact Information:**
-- 📧 Email: priyankashilwant321@gmail.com
-- 📱 Phone: +917887509502
-- 👨‍💻 GitHub: https://github.com/Priyanka2-ui
+{_CONTACT_INFO}
 
 Always stay in character.  
 Always speak clearly and professionally.  
-Always represent Priyanka accurately and confidently.""",
-        )
+Always represent Priyanka accurately and confidently.""")
+
+# Azure caches identical prompt prefixes, so the instructions must not drift between
+# deploys by accident. Editing them requires bumping ASSISTANT_PROMPT_VERSION and
+# pinning the new hash in check_prompt_hash.py; that script is only enforced where
+# it runs, i.e. in the build command documented in the README.
+ASSISTANT_PROMPT_VERSION = 1
+ASSISTANT_PROMPT_HASH = hashlib.sha256(ASSISTANT_INSTRUCTIONS.encode()).hexdigest()
+
+
+def log_prompt_hash():
+    """Log the prompt version and hash; call once logging is configured."""
+    logger.info("Assistant prompt v%s sha256=%s", ASSISTANT_PROMPT_VERSION, ASSISTANT_PROMPT_HASH)
+
+class Assistant(Agent):
+    def __init__(self) -> None:
+        # The instructions are the session's system prompt and must remain the first
+        # content sent to the realtime model, or the cached prefix stops matching.
+        # Keep anything per-session (greetings, context) after them.
+        super().__init__(instructions=ASSISTANT_INSTRUCTIONS)
 
     async def astart(self, ctx: RunContext):
         """
@@ -187,6 +250,9 @@ Always represent Priyanka accurately and confidently.""",
         await ctx.say("Hello! I'm Priyanka Shilwant. I'm excited to be here. I'm ready to answer any questions you have about my background, experience, projects, and technical skills.", allow_interruptions=False)
 
 
+# Each job process loads its own VAD. A forkserver preload was tried to share one
+# copy, but the preload list is process-global and LiveKit's Worker sets it for its
+# plugins, so an entry registered here isn't guaranteed to survive.
 def prewarm(proc: JobProcess):
     proc.userdata["vad"] = silero.VAD.load()
 
@@ -199,20 +265,7 @@ async def entrypoint(ctx: JobContext):
 
     # Set up a voice AI pipeline using OpenAI and the LiveKit turn detector
     session = AgentSession(
-        llm=openai.realtime.RealtimeModel.with_azure(
-            azure_deployment="gpt-4o-realtime-preview",
-            azure_endpoint=os.getenv("AZURE_OPENAI_REALTIME_ENDPOINT"),
-            api_key=os.getenv("AZURE_OPENAI_REALTIME_API_KEY"),
-            api_version=os.getenv("AZURE_OPENAI_REALTIME_API_VERSION"),
-            turn_detection=TurnDetection(
-                type="server_vad",
-                threshold=0.5,
-                prefix_padding_ms=300,
-                silence_duration_ms=500,
-                create_response=True,
-                interrupt_response=True,
-            ),
-        ),
+        llm=build_realtime_model(),
         # Note: The original TTS provider (Cartesia) is not included here as
         # openai.realtime.RealtimeModel handles both LLM and TTS.
         # If you wish to use a separate TTS, you can add it here.
@@ -221,14 +274,19 @@ async def entrypoint(ctx: JobContext):
     # log metrics as they are emitted, and total usage after session is over
     usage_collector = metrics.UsageCollector()
 
+    metrics_events = 0
+
     @session.on("metrics_collected")
     def _on_metrics_collected(ev: MetricsCollectedEvent):
-        metrics.log_metrics(ev.metrics)
+        nonlocal metrics_events
         usage_collector.collect(ev.metrics)
+        metrics_events += 1
+        if ENABLE_PER_EVENT_METRICS_LOG and metrics_events % METRICS_LOG_EVERY == 0:
+            metrics.log_metrics(ev.metrics, logger=logger)
 
     async def log_usage():
         summary = usage_collector.get_summary()
-        logger.info(f"Usage: {summary}")
+        logger.info("Usage: %s", summary)
 
     # shutdown callbacks are triggered when the session is over
     ctx.add_shutdown_callback(log_usage)
@@ -249,5 +307,9 @@ async def entrypoint(ctx: JobContext):
     await ctx.connect()
 
 
+def worker_options() -> WorkerOptions:
+    return WorkerOptions(entrypoint_fnc=entrypoint, prewarm_fnc=prewarm)
+
+
 if __name__ == "__main__":
-    cli.run_app(WorkerOptions(entrypoint_fnc=entrypoint, prewarm_fnc=prewarm))
+    cli.run_app(worker_options())
@@ -1,101 +1,104 @@
 import os
-import subprocess
-import threading
-import time
+import asyncio
+import logging
 import sys
-from fastapi import FastAPI
+from fastapi import FastAPI, Response
 import uvicorn
 from dotenv import load_dotenv
+from livekit.agents import Worker
 
 load_dotenv()
 
+# Try importing from backend.main first (for when running from root),
+# otherwise import from main (for when running from backend directory)
+try:
+    from backend.main import log_prompt_hash, worker_options
+except ImportError:
+    from main import log_prompt_hash, worker_options
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s %(message)s")
+logger = logging.getLogger(__name__)
+
 app = FastAPI()
 
+# Probe bodies never change, so skip per-request JSON encoding
+_ROOT_BYTES = b'{"status":"agent_running","service":"livekit-agent"}'
+_HEALTH_BYTES = b'{"status":"healthy"}'
+_READY_BYTES = b'{"status":"ready"}'
+_NOT_READY_BYTES = b'{"status":"starting"}'
+
 @app.get("/")
-def root():
-    return {"status": "agent_running", "service": "livekit-agent"}
+async def root():
+    return Response(content=_ROOT_BYTES, media_type="application/json")
 
 @app.get("/health")
-def health():
-    return {"status": "healthy"}
+async def health():
+    return Response(content=_HEALTH_BYTES, media_type="application/json")
 
-# Global variable to store the agent process
-agent_process = None
+# The LiveKit worker runs on the same event loop as the HTTP server
+agent_worker = None
+agent_task = None
+# Set once the worker has registered with the LiveKit server and can take jobs
+_agent_ready_event = asyncio.Event()
 
-def start_agent():
-    """Start the LiveKit agent in a subprocess"""
-    global agent_process
+@app.get("/ready")
+async def ready():
+    if agent_task is not None and not agent_task.done() and _agent_ready_event.is_set():
+        return Response(content=_READY_BYTES, media_type="application/json")
+    return Response(content=_NOT_READY_BYTES, status_code=503, media_type="application/json")
+
+def _route_livekit_logs():
+    """Keep LiveKit's INFO logs (registration, forwarded job logs) on the root handler."""
+    logging.getLogger("livekit").setLevel(logging.INFO)
+
+async def run_worker():
+    """Run the LiveKit agent worker until it is closed"""
+    global agent_worker
+    agent_worker = Worker(
+        worker_options(),
+        devmode=False,
+        loop=asyncio.get_running_loop(),
+    )
+    agent_worker.on("worker_registered", lambda *_: _agent_ready_event.set())
     try:
-        # Get the directory where this script is located
-        script_dir = os.path.dirname(os.path.abspath(__file__))
-        
-        # Start the agent process (non-blocking)
-        agent_process = subprocess.Popen(
-            [sys.executable, "main.py", "start"],
-            cwd=script_dir,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            bufsize=1,
-            universal_newlines=True
-        )
-        
-        # Log output in real-time
-        def log_output(pipe, prefix):
-            for line in iter(pipe.readline, ''):
-                if line:
-                    print(f"[{prefix}] {line.strip()}")
-            pipe.close()
-        
-        # Start threads to log stdout and stderr
-        stdout_thread = threading.Thread(
-            target=log_output, 
-            args=(agent_process.stdout, "AGENT"),
-            daemon=True
-        )
-        stderr_thread = threading.Thread(
-            target=log_output, 
-            args=(agent_process.stderr, "AGENT-ERROR"),
-            daemon=True
-        )
-        stdout_thread.start()
-        stderr_thread.start()
-        
-        print(f"Agent process started with PID: {agent_process.pid}")
-        
+        await agent_worker.run()
     except Exception as e:
-        print(f"Error starting agent: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("Error running agent worker: %s", e)
+    finally:
+        _agent_ready_event.clear()
 
-def cleanup():
-    """Clean up the agent process on exit"""
-    global agent_process
-    if agent_process:
-        print("Stopping agent process...")
-        agent_process.terminate()
-        try:
-            agent_process.wait(timeout=10)
-        except subprocess.TimeoutExpired:
-            agent_process.kill()
-        print("Agent process stopped")
+@app.on_event("startup")
+async def _boot():
+    global agent_task
+    _route_livekit_logs()
+    log_prompt_hash()
+    agent_task = asyncio.create_task(run_worker())
+    logger.info("Agent worker started")
 
-# Register cleanup on exit
-import atexit
-atexit.register(cleanup)
+@app.on_event("shutdown")
+async def _shutdown():
+    if agent_worker:
+        logger.info("Stopping agent worker...")
+        await agent_worker.aclose()
+    if agent_task:
+        await agent_task
+    logger.info("Agent worker stopped")
 
 if __name__ == "__main__":
-    # Start agent in background thread
-    agent_thread = threading.Thread(target=start_agent, daemon=False)
-    agent_thread.start()
-    
-    # Give agent more time to start (LiveKit agents need time to initialize)
-    time.sleep(5)
-    
     # Start HTTP server to keep Render happy (it needs an open port)
     port = int(os.getenv("PORT", 8000))
     
     try:
-        uvicorn.run(app, host="0.0.0.0", port=port)
+        workers = int(os.getenv("WEB_CONCURRENCY", 1))
+        # uvicorn can only fork workers from an import string
+        uvicorn.run(
+            "start_agent:app" if workers > 1 else app,
+            host="0.0.0.0",
+            port=port,
+            loop="uvloop",
+            http="httptools",
+            workers=workers,
+            log_level="warning",
+        )
     except KeyboardInterrupt:
-        cleanup()
         sys.exit(0)